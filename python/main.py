@@ -1,116 +1,207 @@
-import random
-import matplotlib.pyplot as plt
-import seaborn as sns
-from collections import deque
+import numpy as np
+from numba import njit, guvectorize, int32, float64
 from typing import List, Dict, Tuple, Any
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 
 # ============================================================================
-# CLASSES 1, 2, 4 (No changes here, logic is sound)
+# 0. NUMBA KERNELS
 # ============================================================================
+@njit(cache=True)
+def _solve_propose(prefs: np.ndarray, resp_ranks: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gale-Shapley with the rows of `prefs` proposing; returns engagements[responder] = proposer
+    and the number of proposals each proposer made (its final partner sits at rank count - 1).
+    Specialized for complete preference lists: every proposer ends up engaged, so the loop
+    only counts free proposers and never checks for an exhausted list.
+    """
+    free = np.arange(n).astype(np.int32)  # ring buffer, never holds more than n proposers
+    head, tail, n_free = 0, 0, n
+    engagements = np.full(n, -1, np.int32)
+    proposals_made = np.zeros(n, np.int32)
+    while n_free > 0:
+        s = free[head]
+        head = head + 1 if head + 1 < n else 0
+        e = prefs[s, proposals_made[s]]
+        proposals_made[s] += 1
+        cur = engagements[e]  # -1 sentinel doubles as the "is free" test; a separate bitset only adds a load
+        if cur < 0:
+            engagements[e] = s
+            n_free -= 1
+            continue
+        if resp_ranks[e, s] < resp_ranks[e, cur]:
+            engagements[e] = s
+            s = cur
+        free[tail] = s
+        tail = tail + 1 if tail + 1 < n else 0
+    return engagements, proposals_made
+
+@njit(cache=True)
+def _random_permutations(out: np.ndarray, seed: int):
+    """Fills every row (last axis) of `out` with a uniform random permutation, in place (Fisher-Yates)."""
+    np.random.seed(seed)
+    n = out.shape[-1]
+    if n == 0:
+        return
+    rows = out.reshape(out.size // n, n)
+    for r in range(rows.shape[0]):
+        row = rows[r]
+        for i in range(n):
+            row[i] = i
+        for i in range(n - 1, 0, -1):
+            j = np.random.randint(0, i + 1)
+            row[i], row[j] = row[j], row[i]
+
+@guvectorize([(int32[:, :], int32[:, :], float64[:], float64[:])], '(n,n),(n,n)->(),()', target='parallel', cache=True)
+def _satisfaction_scores(prop_prefs, resp_prefs, prop_score, resp_score):
+    """One full run (ranking, Gale-Shapley, scoring) per instance; broadcasts over leading batch axes."""
+    n = prop_prefs.shape[0]
+    resp_ranks = np.empty_like(resp_prefs)
+    for i in range(n):
+        for k in range(n):
+            resp_ranks[i, resp_prefs[i, k]] = k
+    engagements, proposals_made = _solve_propose(prop_prefs, resp_ranks, n)
+    prop_total, resp_total = proposals_made.sum() - n, 0
+    for r in range(n):
+        resp_total += resp_ranks[r, engagements[r]]
+    prop_score[0] = 100 * (1 - prop_total / n / (n - 1)) if n > 1 else 100
+    resp_score[0] = 100 * (1 - resp_total / n / (n - 1)) if n > 1 else 100
+
+# ============================================================================
+# CLASSES 1, 2, 4
+# ============================================================================
+def _rank_matrix(prefs: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Inverts each preference row: ranks[i, prefs[i, k]] = k. Writes into `out` when given."""
+    n = prefs.shape[0]
+    if prefs.shape != (n, n) or (n > 0 and (prefs.min() < 0 or prefs.max() >= n)):
+        raise ValueError("Preferences must be an n x n matrix of indices in [0, n).")
+    ranks = np.empty((n, n), np.int32) if out is None else out
+    ranks.fill(-1)
+    ranks[np.arange(n)[:, None], prefs] = np.arange(n, dtype=np.int32)
+    # A row that repeats an index leaves a hole; the solver relies on complete lists.
+    if n > 0 and ranks.min() < 0:
+        raise ValueError("Each preference list must be a complete permutation of the other group.")
+    return ranks
+
 class StableMarriageAlgorithm:
-    def __init__(self, students: List[str], establishments: List[str],
-                 student_prefs: Dict[str, List[str]], establishment_prefs: Dict[str, List[str]]):
-        self.students, self.establishments = students, establishments
+    def __init__(self, student_prefs: np.ndarray, establishment_prefs: np.ndarray):
+        # Participants are identified by their index 0..n-1; prefs[i, k] is the k-th choice of i.
+        self.n = len(student_prefs)
+        # Two pairs of ranking buffers: load() fills the spare pair and swaps it in only once
+        # both matrices validate, so a failed load leaves the current instance untouched.
+        self._student_rankings, self._spare_student_rankings = np.empty((2, self.n, self.n), np.int32)
+        self._establishment_rankings, self._spare_establishment_rankings = np.empty((2, self.n, self.n), np.int32)
+        self.load(student_prefs, establishment_prefs)
+    def load(self, student_prefs: np.ndarray, establishment_prefs: np.ndarray):
+        """Switches to a new instance of the same size, reusing the ranking buffers."""
+        if student_prefs.shape != (self.n, self.n) or establishment_prefs.shape != (self.n, self.n):
+            raise ValueError("Participant groups must be of the same size.")
+        student_rankings = _rank_matrix(student_prefs, out=self._spare_student_rankings)
+        establishment_rankings = _rank_matrix(establishment_prefs, out=self._spare_establishment_rankings)
+        self._spare_student_rankings, self._student_rankings = self._student_rankings, student_rankings
+        self._spare_establishment_rankings, self._establishment_rankings = self._establishment_rankings, establishment_rankings
         self.student_prefs, self.establishment_prefs = student_prefs, establishment_prefs
-        self.n = len(students)
-        self._student_rankings = {s: {e: i for i, e in enumerate(prefs)} for s, prefs in self.student_prefs.items()}
-        self._establishment_rankings = {e: {s: i for i, s in enumerate(prefs)} for e, prefs in self.establishment_prefs.items()}
-    def solve_students_propose(self) -> Dict[str, str]:
-        free_students: deque[str] = deque(self.students)
-        engagements: Dict[str, str] = {}
-        proposals_made: Dict[str, int] = {s: 0 for s in self.students}
-        while free_students:
-            student = free_students.popleft()
-            establishment = self.student_prefs[student][proposals_made[student]]
-            proposals_made[student] += 1
-            if establishment not in engagements:
-                engagements[establishment] = student
-            else:
-                current_partner = engagements[establishment]
-                if self._establishment_rankings[establishment][student] < self._establishment_rankings[establishment][current_partner]:
-                    engagements[establishment] = student
-                    free_students.append(current_partner)
-                else:
-                    free_students.append(student)
-        return {student: est for est, student in engagements.items()}
-    def solve_establishments_propose(self) -> Dict[str, str]:
-        free_establishments: deque[str] = deque(self.establishments)
-        engagements: Dict[str, str] = {}
-        proposals_made: Dict[str, int] = {e: 0 for e in self.establishments}
-        while free_establishments:
-            establishment = free_establishments.popleft()
-            student = self.establishment_prefs[establishment][proposals_made[establishment]]
-            proposals_made[establishment] += 1
-            if student not in engagements:
-                engagements[student] = establishment
-            else:
-                current_partner = engagements[student]
-                if self._student_rankings[student][establishment] < self._student_rankings[student][current_partner]:
-                    engagements[student] = establishment
-                    free_establishments.append(current_partner)
-                else:
-                    free_establishments.append(establishment)
-        return engagements
-    def verify_stability(self, matching: Dict[str, str]) -> Tuple[bool, List[Tuple[str, str]]]:
+    # Matchings are int32 arrays: matching[student] = establishment. Each solver also
+    # returns the rank every student gives its partner, so nobody has to recompute it.
+    def solve_students_propose(self) -> Tuple[np.ndarray, np.ndarray]:
+        engagements, proposals_made = _solve_propose(self.student_prefs, self._establishment_rankings, self.n)
+        matching = np.empty(self.n, np.int32)
+        matching[engagements] = np.arange(self.n)
+        return matching, proposals_made - 1
+    def solve_establishments_propose(self) -> Tuple[np.ndarray, np.ndarray]:
+        matching, _ = _solve_propose(self.establishment_prefs, self._student_rankings, self.n)
+        return matching, self._student_rankings[np.arange(self.n), matching]
+    def verify_stability(self, matching: np.ndarray, student_ranks: np.ndarray = None) -> Tuple[bool, List[Tuple[int, int]]]:
+        if student_ranks is None:
+            student_ranks = self._student_rankings[np.arange(self.n), matching]
+        rev = np.empty(self.n, np.int32)
+        rev[matching] = np.arange(self.n)
         blocking_pairs = []
-        for student, establishment in matching.items():
-            student_rank_of_partner = self._student_rankings[student][establishment]
-            for i in range(student_rank_of_partner):
-                preferred_establishment = self.student_prefs[student][i]
-                partner_of_preferred_est = [s for s, e in matching.items() if e == preferred_establishment][0]
-                if self._establishment_rankings[preferred_establishment][student] < self._establishment_rankings[preferred_establishment][partner_of_preferred_est]:
-                    blocking_pairs.append((student, preferred_establishment))
+        for student in range(self.n):
+            # Only the establishments the student ranks above its partner can block.
+            preferred = self.student_prefs[student, :student_ranks[student]]
+            blocks = self._establishment_rankings[preferred, student] < self._establishment_rankings[preferred, rev[preferred]]
+            blocking_pairs.extend((student, int(e)) for e in preferred[blocks])
         return len(blocking_pairs) == 0, blocking_pairs
 
 class SatisfactionAnalyzer:
-    def __init__(self, matching: Dict[str, str], student_prefs: Dict[str, List[str]], establishment_prefs: Dict[str, List[str]]):
-        self.matching, self.student_prefs, self.establishment_prefs = matching, student_prefs, establishment_prefs
-        self.n = len(student_prefs)
-    def _get_ranks(self) -> Tuple[Dict[str, int], Dict[str, int]]:
-        student_ranks = {s: self.student_prefs[s].index(e) for s, e in self.matching.items()}
-        rev_matching = {e: s for s, e in self.matching.items()}
-        establishment_ranks = {e: self.establishment_prefs[e].index(s) for e, s in rev_matching.items()}
-        return student_ranks, establishment_ranks
+    def __init__(self, matching: np.ndarray, student_ranks: np.ndarray, establishment_rankings: np.ndarray):
+        self.matching, self.student_ranks, self.establishment_rankings = matching, student_ranks, establishment_rankings
+        self.n = len(matching)
+    def _get_ranks(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Student ranks come straight from the solver; only the establishment side needs a gather.
+        establishment_ranks = self.establishment_rankings[self.matching, np.arange(self.n)]
+        return self.student_ranks, establishment_ranks
     def full_analysis(self) -> Dict[str, Any]:
         s_ranks, e_ranks = self._get_ranks()
-        s_avg_rank = sum(s_ranks.values()) / self.n if self.n > 0 else 0
-        e_avg_rank = sum(e_ranks.values()) / self.n if self.n > 0 else 0
+        s_avg_rank = float(s_ranks.mean()) if self.n > 0 else 0
+        e_avg_rank = float(e_ranks.mean()) if self.n > 0 else 0
         s_sat_score = 100 * (1 - s_avg_rank / (self.n - 1)) if self.n > 1 else 100
         e_sat_score = 100 * (1 - e_avg_rank / (self.n - 1)) if self.n > 1 else 100
         return {
-            "students": {"avg_rank": s_avg_rank, "top_1_pct": sum(1 for r in s_ranks.values() if r == 0) / self.n * 100 if self.n > 0 else 0, "top_3_pct": sum(1 for r in s_ranks.values() if r < 3) / self.n * 100 if self.n > 0 else 0, "satisfaction_score": s_sat_score},
-            "establishments": {"avg_rank": e_avg_rank, "top_1_pct": sum(1 for r in e_ranks.values() if r == 0) / self.n * 100 if self.n > 0 else 0, "top_3_pct": sum(1 for r in e_ranks.values() if r < 3) / self.n * 100 if self.n > 0 else 0, "satisfaction_score": e_sat_score},
-            "overall": {"egalitarian_cost": sum(s_ranks.values()) + sum(e_ranks.values()), "sex_equality_score": abs(s_sat_score - e_sat_score)}
+            "students": {"avg_rank": s_avg_rank, "top_1_pct": float((s_ranks == 0).mean()) * 100 if self.n > 0 else 0, "top_3_pct": float((s_ranks < 3).mean()) * 100 if self.n > 0 else 0, "satisfaction_score": s_sat_score},
+            "establishments": {"avg_rank": e_avg_rank, "top_1_pct": float((e_ranks == 0).mean()) * 100 if self.n > 0 else 0, "top_3_pct": float((e_ranks < 3).mean()) * 100 if self.n > 0 else 0, "satisfaction_score": e_sat_score},
+            "overall": {"egalitarian_cost": int(s_ranks.sum()) + int(e_ranks.sum()), "sex_equality_score": abs(s_sat_score - e_sat_score)}
         }
 
 class ExperimentRunner:
-    def __init__(self, n: int):
+    def __init__(self, n: int, plot: bool = True, seed: int = None):
         self.n = n
-        self.students = [f'S_{i+1}' for i in range(n)]
-        self.establishments = [f'E_{i+1}' for i in range(n)]
+        # Names are only kept for display; the pipeline works on indices 0..n-1.
+        self.student_names = np.array([f'S_{i+1}' for i in range(n)])
+        self.establishment_names = np.array([f'E_{i+1}' for i in range(n)])
         self.console = Console()
-        self.visualizer = Visualizer()
+        # Plotting is opt-out so that pure-compute runs never import matplotlib.
+        self.visualizer = Visualizer() if plot else None
+        # Every random draw of the experiment comes from this Generator, so a seed makes it reproducible.
+        self.rng = np.random.default_rng(seed)
         self.student_prefs, self.establishment_prefs = self._generate_preferences()
-    def _generate_preferences(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
-        student_prefs = {s: random.sample(self.establishments, self.n) for s in self.students}
-        establishment_prefs = {e: random.sample(self.students, self.n) for e in self.establishments}
+    def _generate_preferences(self, *batch: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Leading `batch` dimensions generate that many independent instances at once. Shuffling
+        # straight into int32 avoids the float64 scratch matrix an argsort would need.
+        student_prefs = np.empty((*batch, self.n, self.n), np.int32)
+        establishment_prefs = np.empty((*batch, self.n, self.n), np.int32)
+        _random_permutations(student_prefs, self.rng.integers(2**32))
+        _random_permutations(establishment_prefs, self.rng.integers(2**32))
         return student_prefs, establishment_prefs
     def run_single_experiment(self):
         self.console.print(Panel(f"[bold blue]Lancement d'une simulation unique avec n={self.n}[/bold blue]", title="Expérience Unique", expand=False))
-        algo = StableMarriageAlgorithm(self.students, self.establishments, self.student_prefs, self.establishment_prefs)
-        matching_sp = algo.solve_students_propose(); is_stable_sp, _ = algo.verify_stability(matching_sp)
-        analyzer_sp = SatisfactionAnalyzer(matching_sp, self.student_prefs, self.establishment_prefs)
+        algo = StableMarriageAlgorithm(self.student_prefs, self.establishment_prefs)
+        matching_sp, s_ranks_sp = algo.solve_students_propose(); _, blocking_sp = algo.verify_stability(matching_sp, s_ranks_sp)
+        analyzer_sp = SatisfactionAnalyzer(matching_sp, s_ranks_sp, algo._establishment_rankings)
         analysis_sp = analyzer_sp.full_analysis()
-        matching_ep = algo.solve_establishments_propose(); is_stable_ep, _ = algo.verify_stability(matching_ep)
-        analyzer_ep = SatisfactionAnalyzer(matching_ep, self.student_prefs, self.establishment_prefs)
+        matching_ep, s_ranks_ep = algo.solve_establishments_propose(); _, blocking_ep = algo.verify_stability(matching_ep, s_ranks_ep)
+        analyzer_ep = SatisfactionAnalyzer(matching_ep, s_ranks_ep, algo._establishment_rankings)
         analysis_ep = analyzer_ep.full_analysis()
-        self._display_single_results(analysis_sp, is_stable_sp, "Étudiants Proposent")
-        self._display_single_results(analysis_ep, is_stable_ep, "Établissements Proposent")
-        self.visualizer.plot_satisfaction_comparison(analysis_sp, analysis_ep, self.n)
-    def _display_single_results(self, analysis: Dict, is_stable: bool, title: str):
+        self._display_single_results(analysis_sp, matching_sp, blocking_sp, "Étudiants Proposent")
+        self._display_single_results(analysis_ep, matching_ep, blocking_ep, "Établissements Proposent")
+        if self.visualizer:
+            self.visualizer.plot_satisfaction_comparison(analysis_sp, analysis_ep, self.n)
+    def run_statistical_analysis(self, num_runs: int = 100) -> Tuple[Dict, Dict]:
+        if num_runs < 1:
+            raise ValueError("The number of runs must be at least 1.")
+        self.console.print(Panel(f"[bold blue]Analyse statistique sur {num_runs} simulations avec n={self.n}[/bold blue]", title="Analyse Statistique", expand=False))
+        s_prefs_batch, e_prefs_batch = self._generate_preferences(num_runs)
+        # A single gufunc call per scenario replaces the Python loop over runs.
+        s_scores_sp, e_scores_sp = _satisfaction_scores(s_prefs_batch, e_prefs_batch)
+        e_scores_ep, s_scores_ep = _satisfaction_scores(e_prefs_batch, s_prefs_batch)
+        # Same layout as full_analysis() so the results plug into the Visualizer.
+        analysis_sp = {"students": {"satisfaction_score": float(s_scores_sp.mean())}, "establishments": {"satisfaction_score": float(e_scores_sp.mean())}}
+        analysis_ep = {"students": {"satisfaction_score": float(s_scores_ep.mean())}, "establishments": {"satisfaction_score": float(e_scores_ep.mean())}}
+        self._display_statistical_results(analysis_sp, analysis_ep, num_runs)
+        if self.visualizer:
+            self.visualizer.plot_satisfaction_comparison(analysis_sp, analysis_ep, self.n, num_runs)
+        return analysis_sp, analysis_ep
+    def _display_statistical_results(self, analysis_sp: Dict, analysis_ep: Dict, num_runs: int):
+        table = Table(title=f"Satisfaction Moyenne sur {num_runs} Simulations", show_header=True, header_style="bold magenta")
+        table.add_column("Scénario", style="dim", width=25); table.add_column("Étudiants", justify="right"); table.add_column("Établissements", justify="right")
+        for scenario, analysis in (("Étudiants Proposent", analysis_sp), ("Établissements Proposent", analysis_ep)):
+            table.add_row(scenario, f"{analysis['students']['satisfaction_score']:.2f} / 100", f"{analysis['establishments']['satisfaction_score']:.2f} / 100")
+        self.console.print(table)
+    def to_name_dict(self, matching: np.ndarray) -> Dict[str, str]:
+        return dict(zip(self.student_names.tolist(), self.establishment_names[matching].tolist()))
+    def _display_single_results(self, analysis: Dict, matching: np.ndarray, blocking_pairs: List[Tuple[int, int]], title: str):
         table = Table(title=title, show_header=True, header_style="bold magenta")
         table.add_column("Métrique", style="dim", width=25); table.add_column("Étudiants", justify="right"); table.add_column("Établissements", justify="right")
         table.add_row("Score de Satisfaction", f"{analysis['students']['satisfaction_score']:.2f} / 100", f"{analysis['establishments']['satisfaction_score']:.2f} / 100")
@@ -118,8 +209,12 @@ class ExperimentRunner:
         table.add_row("Pourcentage Top 1", f"{analysis['students']['top_1_pct']:.1f}%", f"{analysis['establishments']['top_1_pct']:.1f}%")
         table.add_row("Pourcentage Top 3", f"{analysis['students']['top_3_pct']:.1f}%", f"{analysis['establishments']['top_3_pct']:.1f}%")
         self.console.print(table)
-        stable_text = "[bold green]✓ Matching STABLE[/bold green]" if is_stable else "[bold red]✗ Matching INSTABLE[/bold red]"
+        if self.n <= 20:  # the full list is only readable for small instances
+            self.console.print("Appariements: " + ", ".join(f"{s} → {e}" for s, e in self.to_name_dict(matching).items()))
+        stable_text = "[bold green]✓ Matching STABLE[/bold green]" if not blocking_pairs else "[bold red]✗ Matching INSTABLE[/bold red]"
         self.console.print(f"Stabilité: {stable_text}")
+        for s, e in blocking_pairs:
+            self.console.print(f"  Paire bloquante: ({self.student_names[s]}, {self.establishment_names[e]})")
         self.console.print(f"Coût Égalitaire: [bold yellow]{analysis['overall']['egalitarian_cost']}[/bold yellow]")
         self.console.print(f"Score d'Inégalité: [bold red]{analysis['overall']['sex_equality_score']:.2f}[/bold red]\n")
 
@@ -129,13 +224,19 @@ class ExperimentRunner:
 class Visualizer:
     """Handles the creation of plots with a focus on informational clarity."""
     def __init__(self, style: str = 'whitegrid'):
-        sns.set_theme(style=style, palette='deep')
+        import matplotlib.pyplot as plt
+        # Matplotlib's bundled copies of the seaborn theme, without importing seaborn (and scipy/pandas).
+        plt.style.use([f'seaborn-v0_8-{style}', 'seaborn-v0_8-deep', 'seaborn-v0_8-notebook'])
 
-    def plot_satisfaction_comparison(self, analysis_sp: Dict, analysis_ep: Dict, n: int):
+    def plot_satisfaction_comparison(self, analysis_sp: Dict, analysis_ep: Dict, n: int, num_runs: int = 1):
         """
         Generates a high-clarity grouped bar chart.
         This version groups by SCENARIO to make the algorithm's bias obvious.
+        With num_runs > 1 the scores are averages and the plot is saved under its own name.
         """
+        # Imported here so that runs without plotting never load matplotlib.
+        import matplotlib.pyplot as plt
+
         # --- RESTRUCTURED DATA ---
         # Instead of grouping by participant, we group by scenario.
         labels = [
@@ -160,8 +261,9 @@ class Visualizer:
 
         # --- ENHANCED LABELS AND TITLE ---
         ax.set_ylabel('Score de Satisfaction (0-100)', fontsize=14, fontweight='bold')
+        runs_text = f", moyenne sur {num_runs} simulations" if num_runs > 1 else ""
         ax.set_title(
-            f"Preuve Visuelle du Biais de l'Algorithme (n={n})",
+            f"Preuve Visuelle du Biais de l'Algorithme (n={n}{runs_text})",
             fontsize=18, fontweight='bold', pad=20
         )
         ax.set_xticks(x)
@@ -177,11 +279,14 @@ class Visualizer:
         ax.bar_label(rects1, padding=5, fmt='%.1f', fontsize=12, fontweight='bold')
         ax.bar_label(rects2, padding=5, fmt='%.1f', fontsize=12, fontweight='bold')
         
-        sns.despine(left=True)
+        for side in ('top', 'right', 'left'):
+            ax.spines[side].set_visible(False)
         
         fig.tight_layout(rect=[0, 0.1, 1, 1])
-        plt.savefig(f'satisfaction_comparison_restructured_n{n}.png', dpi=300)
+        runs_suffix = f"_runs{num_runs}" if num_runs > 1 else ""
+        plt.savefig(f'satisfaction_comparison_restructured_n{n}{runs_suffix}.png', dpi=300)
         plt.show(block=True)
+        plt.close(fig)
 
 
 # ============================================================================
@@ -190,4 +295,8 @@ class Visualizer:
 if __name__ == "__main__":
     # --- Execute a single, detailed experiment with the redesigned plot ---
     single_run = ExperimentRunner(n=100)
-    single_run.run_single_experiment()
\ No newline at end of file
+    single_run.run_single_experiment()
+
+    # --- Statistical analysis over many random instances (disabled) ---
+    # stats_run = ExperimentRunner(n=100, plot=False)
+    # stats_run.run_statistical_analysis(num_runs=100)
\ No newline at end of file
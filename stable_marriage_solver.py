@@ -1,8 +1,70 @@
-import random
-import matplotlib.pyplot as plt
-from collections import deque
+import numpy as np
+from numba import njit, prange
 from typing import Dict, List, Tuple
 
+
+@njit(cache=True)
+def _solve_gs_inner(pp: np.ndarray, rrank: np.ndarray, match_r: np.ndarray, p_rank: np.ndarray):
+    """
+    Gale-Shapley core on integer IDs, compiled by Numba.
+
+    Takes the proposers' preference matrix and the receivers' rank matrix and writes
+    the match array (proposer ID -> receiver ID) into `match_r`, and into `p_rank` the
+    rank each proposer gives its partner (its last proposal index). The free proposers
+    live in a ring buffer of size n, since no more than n of them can be free at once.
+    """
+    n = pp.shape[0]
+    free = np.arange(n).astype(np.int32)
+    head, tail, n_free = 0, 0, n
+    proposal_index = np.zeros(n, np.int32)
+    current_matches = np.full(n, -1, np.int32)  # receiver ID -> proposer ID
+    # Rank of each receiver's current partner; a free receiver holds INT32_MAX, so any
+    # proposal beats it and one rank lookup per proposal is enough.
+    best_rank = np.full(n, np.iinfo(np.int32).max, np.int32)
+
+    while n_free > 0:
+        proposer = free[head]
+        head = head + 1 if head + 1 < n else 0
+        receiver = pp[proposer, proposal_index[proposer]]
+        proposal_index[proposer] += 1
+
+        rank = rrank[receiver, proposer]
+        if rank < best_rank[receiver]:
+            # match_r is written on every acceptance; a displaced proposer's stale entry is
+            # overwritten when it is accepted again, so no reversal is needed at the end.
+            best_rank[receiver] = rank
+            current_partner = current_matches[receiver]
+            current_matches[receiver] = proposer
+            match_r[proposer] = receiver
+            if current_partner < 0:
+                n_free -= 1
+                continue
+            proposer = current_partner
+        free[tail] = proposer
+        tail = tail + 1 if tail + 1 < n else 0
+
+    p_rank[:] = proposal_index - 1
+
+
+@njit(cache=True)
+def _solve_gs(pp: np.ndarray, rrank: np.ndarray, n: int) -> np.ndarray:
+    match_r = np.empty(n, np.int32)
+    _solve_gs_inner(pp, rrank, match_r, np.empty(n, np.int32))
+    return match_r
+
+
+@njit(parallel=True, cache=True)
+def _solve_batch(all_pp: np.ndarray, all_rrank: np.ndarray, out: np.ndarray, out_p_rank: np.ndarray):
+    # The instances are independent, so each thread solves its own slice of the batch.
+    for b in prange(all_pp.shape[0]):
+        _solve_gs_inner(all_pp[b], all_rrank[b], out[b], out_p_rank[b])
+
+
+# Compile (or load from cache) at import, so the first timed solve does not pay for the JIT.
+_solve_gs(np.zeros((1, 1), np.int32), np.zeros((1, 1), np.int32), 1)
+_solve_batch(np.zeros((1, 1, 1), np.int32), np.zeros((1, 1, 1), np.int32), np.empty((1, 1), np.int32), np.empty((1, 1), np.int32))
+
+
 class StableMarriageSolver:
     """
     A class to solve the Stable Marriage Problem using the Gale-Shapley algorithm.
@@ -19,61 +81,138 @@ class StableMarriageSolver:
 
         self.proposers = proposers
         self.receivers = receivers
-        self.proposer_prefs: Dict[str, List[str]] = {}
-        self.receiver_prefs: Dict[str, List[str]] = {}
-        self._receiver_ranking_map: Dict[str, Dict[str, int]] = {}
+        # Participants are mapped once to contiguous integer IDs; the solver only works on those.
+        self._p_idx: Dict[str, int] = {name: i for i, name in enumerate(proposers)}
+        self._r_idx: Dict[str, int] = {name: i for i, name in enumerate(receivers)}
+        self._alloc_buffers(len(proposers))
+        # One Generator for the instance; only an explicit seed replaces it.
+        self._rng = np.random.default_rng()
         self.matches: Dict[str, str] = {}
+        self.matches_arr: np.ndarray = None  # matches_arr[p_id] = r_id
+
+    def _alloc_buffers(self, n: int):
+        # Every (N, N) matrix is allocated once; new preferences are written into them in place.
+        # self._pp[p_id, k] is the k-th receiver ID of proposer p_id (same layout for self._rp).
+        self._pp = np.empty((n, n), dtype=np.int32)
+        self._rp = np.empty((n, n), dtype=np.int32)
+        self._prank = np.empty((n, n), dtype=np.int32)
+        self._rrank = np.empty((n, n), dtype=np.int32)
+        self._scratch = np.empty((n, n))
+        self._row_ids = np.arange(n)[:, None]
+        self._rank_values = np.arange(n, dtype=np.int32)[None, :]
+        # A rank matrix is only rebuilt when its side's preferences changed since the last build.
+        self._prank_dirty = self._rrank_dirty = True
 
     def set_preferences(self, proposer_prefs: Dict[str, List[str]], receiver_prefs: Dict[str, List[str]]):
-        self.proposer_prefs = proposer_prefs
-        self.receiver_prefs = receiver_prefs
-        self._create_receiver_ranking_map()
+        # Both sides are validated before either is written, so a rejected call changes nothing.
+        pp, prank = self._validated_prefs(self._proposer_ids(proposer_prefs))
+        rp, rrank = self._validated_prefs(self._receiver_ids(receiver_prefs))
+        self._pp[:], self._prank[:], self._rp[:], self._rrank[:] = pp, prank, rp, rrank
+        self._prank_dirty = self._rrank_dirty = False
+        self._clear_matches()
+
+    def set_proposer_preferences(self, proposer_prefs: Dict[str, List[str]]):
+        pp, prank = self._validated_prefs(self._proposer_ids(proposer_prefs))
+        # Nothing is written before validation passes; the rank matrix it built is kept.
+        self._pp[:], self._prank[:] = pp, prank
+        self._prank_dirty = False
+        self._clear_matches()
+
+    def set_receiver_preferences(self, receiver_prefs: Dict[str, List[str]]):
+        rp, rrank = self._validated_prefs(self._receiver_ids(receiver_prefs))
+        self._rp[:], self._rrank[:] = rp, rrank
+        self._rrank_dirty = False
+        self._clear_matches()
+
+    def _proposer_ids(self, proposer_prefs: Dict[str, List[str]]) -> List[List[int]]:
+        return [[self._r_idx[r] for r in proposer_prefs[p]] for p in self.proposers]
+
+    def _receiver_ids(self, receiver_prefs: Dict[str, List[str]]) -> List[List[int]]:
+        return [[self._p_idx[p] for p in receiver_prefs[r]] for r in self.receivers]
+
+    def _clear_matches(self):
+        # A matching belongs to the preferences it was solved on; it is dropped when they change.
+        self.matches = {}
+        self.matches_arr = None
+
+    def _validated_prefs(self, id_lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        # The compiled solver does no bounds checks, so every list must be a full permutation.
+        n = len(self.proposers)
+        if any(len(ids) != n for ids in id_lists):
+            raise ValueError("Each preference list must rank every member of the other group.")
+        prefs = np.array(id_lists, dtype=np.int32).reshape(n, n)
+        ranks = np.full_like(prefs, -1)
+        ranks[self._row_ids, prefs] = self._rank_values
+        # A row that repeats an ID leaves a -1 hole in its ranks.
+        if ranks.min() < 0:
+            raise ValueError("Each preference list must be a complete permutation of the other group.")
+        return prefs, ranks
 
     def generate_and_set_random_preferences(self, seed: int = None):
+        # The argsort of a matrix of iid uniforms gives one uniform random permutation per row.
+        # rng.permuted(base, axis=1, out=self._pp) avoids the sort, but its per-row shuffles measure slower.
         if seed is not None:
-            random.seed(seed)
-        
-        proposer_prefs = {proposer: random.sample(self.receivers, len(self.receivers)) for proposer in self.proposers}
-        receiver_prefs = {receiver: random.sample(self.proposers, len(self.proposers)) for receiver in self.receivers}
-        
-        self.set_preferences(proposer_prefs, receiver_prefs)
+            self._rng = np.random.default_rng(seed)
+        self._rng.random(out=self._scratch)
+        self._pp[:] = self._scratch.argsort(axis=1)
+        self._rng.random(out=self._scratch)
+        self._rp[:] = self._scratch.argsort(axis=1)
+        self._prank_dirty = self._rrank_dirty = True
+        self._clear_matches()
 
-    def _create_receiver_ranking_map(self):
-        for receiver, pref_list in self.receiver_prefs.items():
-            self._receiver_ranking_map[receiver] = {proposer: rank for rank, proposer in enumerate(pref_list)}
+    def _update_ranking_maps(self):
+        # self._rrank[r_id, p_id] is the rank receiver r_id gives to proposer p_id, and
+        # self._prank[p_id, r_id] the rank proposer p_id gives to receiver r_id.
+        # argsort(self._rp, axis=1) yields the same matrix, but the O(N) scatter per row measures faster.
+        if self._prank_dirty:
+            self._prank[self._row_ids, self._pp] = self._rank_values
+            self._prank_dirty = False
+        if self._rrank_dirty:
+            self._rrank[self._row_ids, self._rp] = self._rank_values
+            self._rrank_dirty = False
 
     def solve(self) -> Dict[str, str]:
-        free_proposers = deque(self.proposers)
-        current_matches: Dict[str, str] = {}
-        proposal_index: Dict[str, int] = {p: 0 for p in self.proposers}
-
-        while free_proposers:
-            proposer = free_proposers.popleft()
-            pref_list = self.proposer_prefs[proposer]
-            receiver_index = proposal_index[proposer]
-            receiver = pref_list[receiver_index]
-            proposal_index[proposer] += 1
-
-            if receiver not in current_matches:
-                current_matches[receiver] = proposer
-            else:
-                current_partner = current_matches[receiver]
-                receiver_rankings = self._receiver_ranking_map[receiver]
-                
-                if receiver_rankings[proposer] < receiver_rankings[current_partner]:
-                    current_matches[receiver] = proposer
-                    free_proposers.append(current_partner)
-                else:
-                    free_proposers.append(proposer)
-        
-        self.matches = {proposer: receiver for receiver, proposer in current_matches.items()}
+        self._update_ranking_maps()
+        self.matches_arr = _solve_gs(self._pp, self._rrank, len(self.proposers))
+        # Names are only restored at the end, for printing.
+        self.matches = {self.proposers[p]: self.receivers[r] for p, r in enumerate(self.matches_arr.tolist())}
         return self.matches
 
+    def solve_random_batch(self, num_runs: int, seed: int = None) -> Tuple[float, float]:
+        """
+        Solves `num_runs` independent random instances of this size in parallel.
+
+        Returns the average rank of the proposers and of the receivers over all runs,
+        i.e. the mean of what analyze_satisfaction() would give for each run.
+        """
+        if num_runs < 1:
+            raise ValueError("The number of runs must be at least 1.")
+        n = len(self.proposers)
+        if seed is not None:
+            self._rng = np.random.default_rng(seed)
+        all_pp = self._rng.random((num_runs, n, n)).argsort(axis=-1).astype(np.int32)
+        all_rp = self._rng.random((num_runs, n, n)).argsort(axis=-1).astype(np.int32)
+
+        # Same scatter as _update_ranking_maps, vectorized over the leading batch axis. The
+        # proposer ranks come out of the solver, so no proposer rank tensor is built.
+        batch_ids, row_ids = np.arange(num_runs)[:, None, None], np.arange(n)[None, :, None]
+        all_rrank = np.empty_like(all_rp)
+        all_rrank[batch_ids, row_ids, all_rp] = np.arange(n, dtype=np.int32)
+
+        matches_all = np.empty((num_runs, n), dtype=np.int32)
+        proposer_ranks = np.empty((num_runs, n), dtype=np.int32)
+        _solve_batch(all_pp, all_rrank, matches_all, proposer_ranks)
+
+        # The whole Monte Carlo reduction is one mean per side over the (runs, N) ranks.
+        receiver_ranks = all_rrank[np.arange(num_runs)[:, None], matches_all, np.arange(n)[None, :]]
+        return float(proposer_ranks.mean()), float(receiver_ranks.mean())
+
     def analyze_satisfaction(self) -> Tuple[float, float]:
-        if not self.matches: return -1.0, -1.0
-        proposer_rank_sum = sum(self.proposer_prefs[p].index(r) for p, r in self.matches.items())
-        receiver_rank_sum = sum(self.receiver_prefs[r].index(p) for p, r in self.matches.items())
-        return proposer_rank_sum / len(self.proposers), receiver_rank_sum / len(self.receivers)
+        if self.matches_arr is None: return -1.0, -1.0
+        self._update_ranking_maps()
+        proposer_ranks = np.take_along_axis(self._prank, self.matches_arr[:, None], axis=1)
+        receiver_ranks = self._rrank[self.matches_arr, np.arange(len(self.proposers))]
+        return float(proposer_ranks.mean()), float(receiver_ranks.mean())
 
     def print_results(self, test_case_name: str):
         print(f"--- RÉSULTATS POUR: {test_case_name} ---")
@@ -89,10 +228,14 @@ class StableMarriageSolver:
         print("-" * (24 + len(test_case_name)))
 
 
-def plot_statistical_results(proposer_score: float, receiver_score: float, num_runs: int):
+def plot_statistical_results(proposer_score: float, receiver_score: float, num_runs: int, show: bool = True):
     """
     [NOUVEAU] Crée et affiche un graphique des résultats de l'analyse statistique.
+    Avec show=False, le graphique est seulement sauvegardé, sans être affiché.
     """
+    # Import local: le solveur seul ne charge jamais matplotlib.
+    import matplotlib.pyplot as plt
+
     groups = ['Proposants (Étudiants)', 'Receveurs (Établissements)']
     scores = [proposer_score, receiver_score]
 
@@ -111,7 +254,9 @@ def plot_statistical_results(proposer_score: float, receiver_score: float, num_r
     print("Graphique 'analyse_satisfaction.png' a été sauvegardé.")
     
     # Affichage du graphique
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
 
 # ==============================================================================
 # [TÂCHE 4] Test the program on several datasets
@@ -138,19 +283,11 @@ if __name__ == "__main__":
     print("\n--- DÉBUT: Test 3: Analyse Statistique Robuste ---")
     NUM_RUNS = 100
     NUM_PARTICIPANTS = 50
-    total_proposer_satisfaction, total_receiver_satisfaction = 0, 0
     students_3 = [f'S_{i+1}' for i in range(NUM_PARTICIPANTS)]; establishments_3 = [f'E_{i+1}' for i in range(NUM_PARTICIPANTS)]
     solver3 = StableMarriageSolver(proposers=students_3, receivers=establishments_3)
 
-    for i in range(NUM_RUNS):
-        solver3.generate_and_set_random_preferences()
-        solver3.solve()
-        proposer_score, receiver_score = solver3.analyze_satisfaction()
-        total_proposer_satisfaction += proposer_score
-        total_receiver_satisfaction += receiver_score
-
-    avg_proposer_score = total_proposer_satisfaction / NUM_RUNS
-    avg_receiver_score = total_receiver_satisfaction / NUM_RUNS
+    # All runs are generated up front and solved in parallel in a single call.
+    avg_proposer_score, avg_receiver_score = solver3.solve_random_batch(NUM_RUNS)
 
     print(f"\n[Synthèse sur {NUM_RUNS} runs avec {NUM_PARTICIPANTS}x{NUM_PARTICIPANTS} participants]")
     print(f"  Satisfaction moyenne globale pour les Proposants: {avg_proposer_score:.2f}")